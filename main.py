@@ -1,6 +1,6 @@
 #!/usr/bin/python3
 from tools.database_writer import DataBaseWriter
-from threading import Timer
+import asyncio
 import json
 
 if __name__ == "__main__":
@@ -11,11 +11,7 @@ if __name__ == "__main__":
     db_writer = DataBaseWriter(Tokens=Tokens)
     # db_writer.create_table()
 
-    def exe():
-        db_writer.start_record()
-        Timer(0, exe).start()
-
     try:
-        exe()
+        asyncio.run(db_writer.run_forever())
     except Exception as e:
         print(e)
\ No newline at end of file
@@ -1,4 +1,6 @@
 from tools.deribit_api import Deribit
+import numpy as np
+import asyncio
 
 class ZeroCurve:
 
@@ -12,12 +14,19 @@ class ZeroCurve:
     def get_price_from_orderbook(cls, orderbook):
         return (orderbook['bid'][0][0] + orderbook['ask'][0][0])/2
 
+    async def _get_order_books(self):
+        try:
+            return await asyncio.gather(*(self.drb_api.aget_order_book(symb) for symb in self.symbs))
+        finally:
+            await self.drb_api.close()
+
     def get_market_price(self):
 
-        mkt_price = dict()
-        for symb in self.symbs:
-            price = ZeroCurve.get_price_from_orderbook(self.drb_api.get_order_book(symb))
-            mkt_price[symb] = price
+        order_books = asyncio.run(self._get_order_books())
+        n = len(order_books)
+        bids = np.fromiter((ob['bid'][0][0] for ob in order_books), dtype=float, count=n)
+        asks = np.fromiter((ob['ask'][0][0] for ob in order_books), dtype=float, count=n)
+        mkt_price = dict(zip(self.symbs, (0.5 * (bids + asks)).tolist()))
         mkt_price[self.ccy] = self.drb_api.get_index_price("{}_usd".format(self.ccy.lower()))['result']['index_price']
 
         return mkt_price
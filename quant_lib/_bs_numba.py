@@ -0,0 +1,70 @@
+from math import erfc, exp, sqrt
+from quant_lib.european_option import _SQRT2, _INV_SQRT_2PI, _bs_d1
+
+try:
+    from numba import njit
+except ImportError:
+    # numba is optional; without it these run as plain Python functions
+    def njit(*args, **kwargs):
+        if len(args) == 1 and callable(args[0]) and not kwargs:
+            return args[0]
+        return lambda func: func
+
+# fastmath without 'nnan'/'ninf': implied_vol_nb reports failure as nan, so LLVM must not assume it away
+_FASTMATH = {'nsz', 'arcp', 'contract', 'afn', 'reassoc'}
+
+_bs_d1_nb = njit(cache=True, fastmath=_FASTMATH)(_bs_d1)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def bs_call_price_nb(S, K, r, sigma, q, tau):
+    sqrt_tau = sqrt(tau)
+    d1 = _bs_d1_nb(S, K, r, sigma, q, tau, sqrt_tau)
+    d2 = d1 - sigma * sqrt_tau
+    return S * exp(-q * tau) * 0.5 * erfc(-d1 / _SQRT2) - K * exp(-r * tau) * 0.5 * erfc(-d2 / _SQRT2)
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def bs_call_vega_nb(S, K, r, sigma, q, tau):
+    sqrt_tau = sqrt(tau)
+    d1 = _bs_d1_nb(S, K, r, sigma, q, tau, sqrt_tau)
+    return S * exp(-q * tau) * _INV_SQRT_2PI * exp(-0.5 * d1 * d1) * sqrt_tau
+
+
+@njit(cache=True, fastmath=_FASTMATH)
+def implied_vol_nb(price, S, K, r, q, tau, sigma0=0.5, tol=1e-8, max_iter=100):
+    """
+    Implied volatility of a European call by Newton-Raphson, safeguarded with bisection.
+
+    :param tol: tolerance relative to the option's time value (price above its no-arbitrage lower bound)
+    :return: implied volatility, or nan if the price is outside the no-arbitrage bounds or Newton does not converge
+    """
+    spot_pv = S * exp(-q * tau)
+    lower = max(spot_pv - K * exp(-r * tau), 0.0)
+    # A call is worth strictly between its discounted intrinsic value and the discounted spot for any vol in (0, inf)
+    if not lower < price < spot_pv:
+        return float('nan')
+    # Measured against the time value, so deep in-the-money prices still pin the vol down,
+    # but never finer than float64 can resolve in the price itself
+    tol = max(tol * (price - lower), 1e-14 * price)
+    # Price rises with vol, so every evaluation narrows a bracket [lo, hi] that the Newton steps must stay inside
+    sigma, lo, hi = sigma0, 0.0, float('inf')
+    last_error = float('inf')
+    for _ in range(max_iter):
+        diff = bs_call_price_nb(S, K, r, sigma, q, tau) - price
+        if abs(diff) < tol:
+            return sigma
+        if diff > 0.0:
+            hi = sigma
+        else:
+            lo = sigma
+        vega = bs_call_vega_nb(S, K, r, sigma, q, tau)
+        new_sigma = sigma - diff / vega if vega > 0.0 else float('nan')
+        bounded = hi < float('inf')
+        if not (lo < new_sigma < (hi if bounded else 2.0 * sigma) and abs(diff) < 0.5 * last_error):
+            # Newton left the bracket, vega vanished or progress stalled in a far wing: bisect instead,
+            # or double while there is no upper bound yet
+            new_sigma = 0.5 * (lo + hi) if bounded else 2.0 * sigma
+        last_error = abs(diff)
+        sigma = new_sigma
+    return float('nan')
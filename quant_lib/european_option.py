@@ -1,9 +1,50 @@
-from math import exp, log, sqrt
-from scipy.stats import norm
+from math import erfc, exp, log, pi, sqrt
 from abc import ABC, abstractmethod
+import numpy as np
+from scipy.special import ndtr
+
+_SQRT2 = sqrt(2.0)
+_INV_SQRT_2PI = 1.0 / sqrt(2.0 * pi)
+
+
+def _norm_cdf(x):
+    # erfc keeps precision in the lower tail, where 1 + erf(x) cancels to zero
+    return 0.5 * erfc(-x / _SQRT2)
+
+
+def _norm_pdf(x):
+    return _INV_SQRT_2PI * exp(-0.5 * x * x)
+
+
+def _bs_d1(S, K, r, sigma, q, tau, sqrt_tau):
+    # Plain-math so quant_lib._bs_numba can jit the same definition
+    return (log(S / K) + (r - q + 0.5 * sigma * sigma) * tau) / (sigma * sqrt_tau)
+
+
+def _pricing_input(name):
+    # Property over a pricing input; assigning it invalidates the cached d1/d2
+    attr = '_' + name
+
+    def fget(self):
+        return getattr(self, attr)
+
+    def fset(self, value):
+        setattr(self, attr, value)
+        self._d1 = None
+
+    return property(fget, fset)
 
 
 class EuropeanOption(ABC):
+    __slots__ = ('_S', '_K', '_r', '_sigma', '_q', '_tau', '_d1', '_d2', '_sqrt_tau', '_df', '_dfq')
+
+    S = _pricing_input('S')
+    K = _pricing_input('K')
+    r = _pricing_input('r')
+    sigma = _pricing_input('sigma')
+    q = _pricing_input('q')
+    tau = _pricing_input('tau')
+
     def __init__(self, S, K, r, sigma, q, tau):
         self.S = S
         self.K = K
@@ -12,25 +53,36 @@ class EuropeanOption(ABC):
         self.q = q
         self.tau = tau
 
+    def _update_cache(self):
+        S, K, r, sigma, q, tau = self._S, self._K, self._r, self._sigma, self._q, self._tau
+        self._sqrt_tau = sqrt(tau)
+        self._d1 = _bs_d1(S, K, r, sigma, q, tau, self._sqrt_tau)
+        self._d2 = self._d1 - sigma * self._sqrt_tau
+        self._df = exp(-r * tau)
+        # Dividend discount: the spot leg of the price carries it, so every spot greek does too
+        self._dfq = exp(-q * tau)
+
     def d1(self):
-        S, K, r, sigma, q, tau = self.S, self.K, self.r, self.sigma, self.q, self.tau
-        return (log(S / K) + (r - q + 0.5 * sigma ** 2) * tau) / (sigma * sqrt(tau))
+        if self._d1 is None:
+            self._update_cache()
+        return self._d1
 
     def d2(self):
-        sigma, tau = self.sigma, self.tau
-        return self.d1() - sigma * sqrt(tau)
+        if self._d1 is None:
+            self._update_cache()
+        return self._d2
 
     @abstractmethod
     def delta(self):
         raise NotImplemented
 
     def gamma(self):
-        S, sigma, tau = self.S, self.sigma, self.tau
-        return norm.pdf(self.d1()) / (S * sigma * sqrt(tau))
+        d1 = self.d1()
+        return self._dfq * _norm_pdf(d1) / (self._S * self._sigma * self._sqrt_tau)
 
     def vega(self):
-        S, tau = self.S, self.tau
-        return S * norm.pdf(self.d1()) * sqrt(tau)
+        d1 = self.d1()
+        return self._S * self._dfq * _norm_pdf(d1) * self._sqrt_tau
 
     @abstractmethod
     def theta(self):
@@ -42,20 +94,53 @@ class EuropeanOption(ABC):
 
 
 class EuropeanCall(EuropeanOption, ABC):
+    __slots__ = ()
 
     def __init__(self, S, K, r, sigma, q, tau):
         EuropeanOption.__init__(self, S, K, r, sigma, q, tau)
 
     def delta(self):
-        return norm.cdf(self.d1())
+        d1 = self.d1()
+        return self._dfq * _norm_cdf(d1)
 
     def theta(self):
-        S, K, r, sigma, q, tau = self.S, self.K, self.r, self.sigma, self.q, self.tau
-        return -S * norm.pdf(self.d1()) * sigma / 2 / sqrt(tau) - r * K * exp(-r * tau) * norm.cdf(self.d2())
+        d1 = self.d1()
+        spot_pv = self._S * self._dfq
+        return (-spot_pv * _norm_pdf(d1) * self._sigma / 2 / self._sqrt_tau
+                - self._r * self._K * self._df * _norm_cdf(self._d2)
+                + self._q * spot_pv * _norm_cdf(d1))
 
     def rho(self):
-        S, K, r, sigma, q, tau = self.S, self.K, self.r, self.sigma, self.q, self.tau
-        return K * tau * exp(-r * tau) * norm.cdf(self.d2())
+        d2 = self.d2()
+        return self._K * self._tau * self._df * _norm_cdf(d2)
+
+
+def european_call_price(S, K, r, sigma, q, tau):
+    """
+    Vectorized Black-Scholes price and greeks for European calls.
+
+    :param S, K, r, sigma, q, tau: scalars or array-likes, broadcast against each other
+    :return: dict of arrays with keys 'price', 'delta', 'gamma', 'vega', 'theta', 'rho'
+    """
+    S, K, r, sigma, q, tau = (np.asarray(x, dtype=float) for x in (S, K, r, sigma, q, tau))
+    sqrt_tau = np.sqrt(tau)
+    sigma_sqrt_tau = sigma * sqrt_tau
+    d1 = (np.log(S / K) + (r - q + 0.5 * sigma * sigma) * tau) / sigma_sqrt_tau
+    d2 = d1 - sigma_sqrt_tau
+    cdf_d1 = ndtr(d1)
+    cdf_d2 = ndtr(d2)
+    pdf_d1 = np.exp(-0.5 * d1 * d1) * _INV_SQRT_2PI
+    disc = np.exp(-r * tau)
+    disc_q = np.exp(-q * tau)
+    spot_pv = S * disc_q
+    return {
+        'price': spot_pv * cdf_d1 - K * disc * cdf_d2,
+        'delta': disc_q * cdf_d1,
+        'gamma': disc_q * pdf_d1 / (S * sigma_sqrt_tau),
+        'vega': spot_pv * pdf_d1 * sqrt_tau,
+        'theta': -spot_pv * pdf_d1 * sigma / 2 / sqrt_tau - r * K * disc * cdf_d2 + q * spot_pv * cdf_d1,
+        'rho': K * tau * disc * cdf_d2,
+    }
 
 
 if __name__ == "__main__":
@@ -1,11 +1,20 @@
 #!/usr/bin/python3
 import unittest
 from tools.mysql_api import SQLEngine
-from exchange_api.deribit_api import Deribit
-from sqlalchemy import Integer, String
+from tools.deribit_api import Deribit
+from sqlalchemy import Integer, String, BigInteger, Float, Column, MetaData, Table
 import json
 from tools.database_writer import DataBaseWriter
 import time
+from unittest import mock
+import pandas as pd
+import pymysql
+import math
+import asyncio
+import requests
+from datetime import datetime
+from quant_lib._bs_numba import bs_call_price_nb, implied_vol_nb
+from quant_lib.european_option import EuropeanCall, european_call_price
 
 
 class Test(unittest.TestCase):
@@ -22,9 +31,9 @@ class Test(unittest.TestCase):
         table = db.create_table('test', columns_info)
         data = [
             {'id': 1, 'name': 'jack@yahoo.com'},
-            {'id': 1, 'name': 'jack@msn.com'},
-            {'id': 2, 'name': 'www@www.org'},
-            {'id': 2, 'name': 'wendy@aol.com'},
+            {'id': 2, 'name': 'jack@msn.com'},
+            {'id': 3, 'name': 'www@www.org'},
+            {'id': 4, 'name': 'wendy@aol.com'},
         ]
         db.insert(data, table)
         sql = 'SELECT * FROM test'
@@ -50,6 +59,183 @@ class Test(unittest.TestCase):
         db.execute("DROP TABLE IF EXISTS {}".format(table_name))
 
 
+class TestBulkInsert(unittest.TestCase):
+    # No server needed: the raw connection is replaced by a mock whose LOAD DATA fails with a given error
+
+    def load(self, error):
+        db = SQLEngine()
+        df = pd.DataFrame({'id': [1, 2], 'bid_1': [100.0, 101.0]})
+        con = mock.MagicMock()
+        con.cursor.return_value.execute.side_effect = error
+        with mock.patch.object(db.local_infile_engine(), 'raw_connection', return_value=con), \
+                mock.patch.object(pd.DataFrame, 'to_sql') as to_sql:
+            db.bulk_insert_df(df, 'ticks')
+        return to_sql
+
+    def test_local_infile_only_on_load_engine(self):
+        db = SQLEngine()
+        refused = pymysql.err.OperationalError(2003, "Can't connect to MySQL server")
+        with mock.patch.object(pymysql, 'connect', side_effect=refused) as connect:
+            for engine in (db.db_engine, db.local_infile_engine()):
+                with self.assertRaises(Exception):
+                    engine.raw_connection()
+        self.assertEqual([call.kwargs.get('local_infile') for call in connect.call_args_list], [None, 1])
+
+    def test_falls_back_when_local_infile_disabled(self):
+        to_sql = self.load(pymysql.err.OperationalError(3948, 'Loading local data is disabled'))
+        to_sql.assert_called_once()
+
+    def test_reraises_other_errors(self):
+        with self.assertRaises(pymysql.err.IntegrityError):
+            self.load(pymysql.err.IntegrityError(1062, "Duplicate entry '1' for key 'PRIMARY'"))
+
+    def test_insert_rows_skips_only_duplicate_keys(self):
+        db = SQLEngine()
+        table = Table('ticks', MetaData(), Column('id', BigInteger, primary_key=True), Column('bid_1', Float))
+        con = mock.MagicMock()
+        with mock.patch.object(db.db_engine, 'raw_connection', return_value=con):
+            db.insert_rows(table, [(1, 100.0), (2, 101.0)], True)
+        sql = con.cursor.return_value.executemany.call_args[0][0]
+        self.assertNotIn('IGNORE', sql)
+        self.assertTrue(sql.endswith('ON DUPLICATE KEY UPDATE id=id'))
+        # pymysql only folds executemany into one multi-row INSERT when the statement matches this pattern
+        self.assertIsNotNone(pymysql.cursors.RE_INSERT_VALUES.match(sql))
+
+
+class TestDeribitRetries(unittest.TestCase):
+    # Offline: session.get and get_token are patched, and backoff sleeps are zero
+    BUY = '/api/v2/private/buy?amount=1&instrument_name=BTC-PERPETUAL&price=100'
+
+    def setUp(self) -> None:
+        tokens = {'Deribit': {'Read': {'id': 'key', 'secret': 'secret'}}}
+        self.fetched = []
+
+        def get_token():
+            self.fetched.append(None)
+            return 'token{}'.format(len(self.fetched))
+
+        with mock.patch.object(Deribit, 'get_token', side_effect=get_token):
+            self.client = Deribit(tokens)
+        self.client.get_token = get_token
+        self.client._token_expiry = float('inf')
+        patcher = mock.patch.object(Deribit, '_backoff', return_value=0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    @staticmethod
+    def response(status, body):
+        return mock.Mock(status_code=status, content=json.dumps(body).encode())
+
+    def get(self, *outcomes):
+        self.client.session.get = mock.Mock(side_effect=list(outcomes))
+        return self.client.session.get
+
+    def test_order_not_resent_after_read_timeout(self):
+        get = self.get(requests.ReadTimeout(), self.response(200, {'result': {}}))
+        with self.assertRaises(requests.ReadTimeout):
+            self.client.request(self.BUY)
+        self.assertEqual(get.call_count, 1)
+
+    def test_order_not_resent_after_5xx(self):
+        get = self.get(self.response(502, {'error': 'bad gateway'}), self.response(200, {'result': {}}))
+        self.assertEqual(self.client.request(self.BUY), {'error': 'bad gateway'})
+        self.assertEqual(get.call_count, 1)
+
+    def test_order_resent_after_connect_failure_and_429(self):
+        get = self.get(requests.ConnectTimeout(), self.response(429, {}), self.response(200, {'result': 'ok'}))
+        self.assertEqual(self.client.request(self.BUY), {'result': 'ok'})
+        self.assertEqual(get.call_count, 3)
+
+    def test_read_requests_retried(self):
+        get = self.get(requests.ReadTimeout(), self.response(503, {}), self.response(200, {'result': 'ok'}))
+        self.assertEqual(self.client.request('/api/v2/private/get_positions?currency=BTC'), {'result': 'ok'})
+        self.assertEqual(get.call_count, 3)
+
+    def test_rejected_token_renewed_once(self):
+        get = self.get(self.response(400, {'error': {'code': 13009}}), self.response(200, {'result': 'ok'}))
+        self.assertEqual(self.client.request(self.BUY), {'result': 'ok'})
+        self.assertEqual(len(self.fetched), 2)
+        self.assertEqual(get.call_args[1]['headers']['Authorization'], 'Bearer token2')
+
+    def test_batch_renews_rejected_token_once(self):
+        client = self.client
+
+        class Response:
+            def __init__(self, headers):
+                self.status = 200
+                rejected = headers is not None and headers['Authorization'] == 'Bearer token1'
+                self.body = json.dumps({'error': {'code': 13009}} if rejected else {'result': 'ok'}).encode()
+
+            async def __aenter__(self):
+                await asyncio.sleep(0)
+                return self
+
+            async def __aexit__(self, *exc):
+                pass
+
+            async def read(self):
+                return self.body
+
+        session = mock.Mock(get=lambda url, headers: Response(headers))
+
+        async def run():
+            client._sem, client._token_lock = asyncio.Semaphore(5), asyncio.Lock()
+            with mock.patch.object(client, '_get_session', new=mock.AsyncMock(return_value=session)):
+                cancels = [client._private_url('cancel', {'order_id': i}) for i in range(6)]
+                return await client.aplace_order(cancels), await client.arequest('/api/v2/public/test')
+
+        results, public = asyncio.run(run())
+        self.assertEqual(results, [{'result': 'ok'}] * 6)
+        self.assertEqual(public, {'result': 'ok'})
+        self.assertEqual(len(self.fetched), 2)
+
+
+class TestDeribitDates(unittest.TestCase):
+
+    def test_single_code(self):
+        self.assertEqual(Deribit.conv_drbt_dates('5MAR22'), datetime(2022, 3, 5))
+
+    def test_list_of_codes(self):
+        dates = Deribit.conv_drbt_dates(['5MAR22', '25JUN21'])
+        self.assertEqual(list(dates), [pd.Timestamp(2022, 3, 5), pd.Timestamp(2021, 6, 25)])
+
+
+class TestPricing(unittest.TestCase):
+
+    @staticmethod
+    def finite_difference_greeks(S, K, r, sigma, q, tau, h=1e-4):
+        def price(dS=0.0, dr=0.0, dsigma=0.0, dtau=0.0):
+            return bs_call_price_nb(S + dS, K, r + dr, sigma + dsigma, q, tau + dtau)
+
+        return {
+            'delta': (price(dS=h) - price(dS=-h)) / (2 * h),
+            'gamma': (price(dS=1e-2) - 2 * price() + price(dS=-1e-2)) / 1e-4,
+            'vega': (price(dsigma=h) - price(dsigma=-h)) / (2 * h),
+            'theta': -(price(dtau=h) - price(dtau=-h)) / (2 * h),
+            'rho': (price(dr=h) - price(dr=-h)) / (2 * h),
+        }
+
+    def test_greeks_are_derivatives_of_price(self):
+        strikes = [60, 100, 140]
+        batch = european_call_price(100, strikes, 0.05, 0.2, 0.05, 1.0)
+        for i, K in enumerate(strikes):
+            self.assertAlmostEqual(batch['price'][i], bs_call_price_nb(100, K, 0.05, 0.2, 0.05, 1.0), places=12)
+            call = EuropeanCall(100, K, 0.05, 0.2, 0.05, 1.0)
+            for greek, expected in self.finite_difference_greeks(100, K, 0.05, 0.2, 0.05, 1.0).items():
+                self.assertAlmostEqual(batch[greek][i], expected, places=5)
+                self.assertAlmostEqual(getattr(call, greek)(), expected, places=5)
+
+    def test_implied_vol_round_trip(self):
+        for sigma in (0.1, 0.5, 1.2):
+            for K in (70, 100, 140):
+                price = bs_call_price_nb(100, K, 0.03, sigma, 0.01, 0.5)
+                self.assertAlmostEqual(implied_vol_nb(price, 100, K, 0.03, 0.01, 0.5), sigma, places=6)
+
+    def test_implied_vol_outside_bounds(self):
+        self.assertTrue(math.isnan(implied_vol_nb(0.0, 100, 200, 0.01, 0, 1)))
+        self.assertTrue(math.isnan(implied_vol_nb(120, 100, 50, 0.01, 0, 1)))
+
+
 
 
 
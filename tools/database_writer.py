@@ -1,12 +1,13 @@
-from exchange_api.deribit_api import Deribit
+from tools.deribit_api import Deribit
 from tools.mysql_api import SQLEngine
-from sqlalchemy import String
+from sqlalchemy import BigInteger, Float
 import asyncio
 
 
 class DataBaseWriter:
     def __init__(self, instrument_name="BTC-PERPETUAL", Tokens=None, table_name="deribit_btc_perpetual_tick"):
         self.MAX_COUNT_IN_MINUTES = 5 * 60
+        self.INSERT_BATCH_SIZE = 100
         self.data = []
         self.depth = 5
         self.client = Deribit(Tokens)
@@ -14,40 +15,78 @@ class DataBaseWriter:
         self.table_name = table_name
         self.instrument_name = instrument_name
         self.columns_info = {
-            'columns': {**{'id': String(255)}, **{'bid_{}'.format(i + 1): String(255) for i in range(self.depth)},
-                        **{'bid__vol_{}'.format(i + 1): String(255) for i in range(self.depth)},
-                        **{'ask_{}'.format(i + 1): String(255) for i in range(self.depth)},
-                        **{'ask__vol_{}'.format(i + 1): String(255) for i in range(self.depth)}}, 'primary_key': 'id'}
+            'columns': {**{'id': BigInteger}, **{'bid_{}'.format(i + 1): Float(precision=53) for i in range(self.depth)},
+                        **{'bid__vol_{}'.format(i + 1): Float(precision=53) for i in range(self.depth)},
+                        **{'ask_{}'.format(i + 1): Float(precision=53) for i in range(self.depth)},
+                        **{'ask__vol_{}'.format(i + 1): Float(precision=53) for i in range(self.depth)}}, 'primary_key': 'id'}
 
     def create_table(self):
         self.db.execute("DROP TABLE IF EXISTS {}".format(self.table_name))
         return self.db.create_table(self.table_name, self.columns_info)
 
-    async def store_ticks_to_sqldb(self, count=0):
+    async def store_ticks_to_sqldb(self):
         # When more exchange involved, just change self.__data_from_deribit()
-        if count == 0:
-            self.data = []
-        if count == self.MAX_COUNT_IN_MINUTES:
-            self.db.insert(self.data, self.db.get_table(self.table_name))
-        else:
-            data_slice = await self.__data_from_deribit()
-            self.data.append(data_slice)
-            await self.store_ticks_to_sqldb(count + 1)
+        # Ticks are fetched and inserted by separate coroutines so MySQL writes overlap the next requests
+        table = self.db.get_table(self.table_name)
+        queue = asyncio.Queue()
+        consumer = asyncio.ensure_future(self.__consume_ticks(queue, table))
+        try:
+            await self.__produce_ticks(queue)
+        finally:
+            # Always wait for the flush, so a failed fetch does not cancel the pending insert
+            await consumer
+
+    async def __produce_ticks(self, queue):
+        try:
+            for _ in range(self.MAX_COUNT_IN_MINUTES):
+                await queue.put(await self.__data_from_deribit())
+        finally:
+            # Sentinel: lets the consumer flush what it has even if fetching failed
+            await queue.put(None)
+
+    async def __consume_ticks(self, queue, table):
+        self.data = []
+        while True:
+            data_slice = await queue.get()
+            if data_slice is not None:
+                self.data.append(data_slice)
+            if self.data and (data_slice is None or len(self.data) == self.INSERT_BATCH_SIZE):
+                batch, self.data = self.data, []
+                # id (snapshot timestamp) is the primary key; a repeated timestamp is the same snapshot, so skip it
+                await asyncio.to_thread(self.db.insert_rows, table, batch, True)
+            if data_slice is None:
+                return
 
     def start_record(self):
-        loop = asyncio.new_event_loop()
-        loop.run_until_complete(self.store_ticks_to_sqldb(0))
+        async def record():
+            try:
+                await self.store_ticks_to_sqldb()
+            finally:
+                await self.client.close()
+
+        asyncio.run(record())
+
+    async def run_forever(self):
+        # Record batch after batch on one event loop; a failed batch is logged and retried
+        try:
+            while True:
+                try:
+                    await self.store_ticks_to_sqldb()
+                except Exception as e:
+                    print(e)
+                    await asyncio.sleep(1)
+        finally:
+            await self.client.close()
 
     async def __get_order_book_from_deribit(self):
-        rs = self.client.get_order_book(self.instrument_name, self.depth)
+        rs = await self.client.aget_order_book(self.instrument_name, self.depth)
         return rs
 
     async def __data_from_deribit(self):
         order_book = await self.__get_order_book_from_deribit()
-        data_slice = [order_book['timestamp'],
-                      *[str(order_book['bid'][i][0]) for i in range(self.depth)],
-                      *[str(order_book['bid'][i][1]) for i in range(self.depth)],
-                      *[str(order_book['ask'][i][0]) for i in range(self.depth)],
-                      *[str(order_book['ask'][i][1]) for i in range(self.depth)]]
-        keys = list(self.columns_info['columns'].keys())
-        return {keys[i]: data_slice[i] for i in range(len(keys))}
+        bids = [order_book['bid'][i] for i in range(self.depth)]
+        asks = [order_book['ask'][i] for i in range(self.depth)]
+        row = (order_book['timestamp'],
+               *[level[0] for level in bids], *[level[1] for level in bids],
+               *[level[0] for level in asks], *[level[1] for level in asks])
+        return row
@@ -1,65 +1,284 @@
 import asyncio
-from aiohttp import ClientSession
-from time import time
+from aiohttp import ClientConnectorError, ClientError, ClientSession, ClientTimeout, TCPConnector, WSMsgType
+from time import sleep, time
 import json
+try:
+    # orjson parses large responses (option chains, instrument lists) several times faster
+    from orjson import loads as _loads
+except ImportError:
+    from json import loads as _loads
 from pprint import pprint
 from datetime import datetime
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
+import pandas as pd
+import random
+from urllib.parse import urlencode, urlsplit
 
 
 class Deribit:
-    def __init__(self, Tokens):
+    # Seconds before expiry at which the access token is renewed
+    TOKEN_REFRESH_BUFFER = 60
+    # Pool size and timeout shared by the sync (requests) and async (aiohttp) clients
+    POOL_SIZE = 40
+    REQUEST_TIMEOUT = 10
+    # Instrument lists only change on listings/expiries, so they are cached for this many seconds
+    SYMBOLS_TTL = 300
+    # Attempts per request on connection errors, timeouts, 5xx and 429, with jittered exponential backoff
+    MAX_ATTEMPTS = 4
+    # Deribit error code for an expired or revoked access token
+    TOKEN_EXPIRED_CODE = 13009
+    # Order-entry methods: resending one that may already have reached Deribit could place the order twice
+    ORDER_METHODS = ('/api/v2/private/buy', '/api/v2/private/sell', '/api/v2/private/edit')
+    # One keep-alive pool per event loop, shared by every Deribit instance on it: loop -> [connector, users].
+    # A plain dict: the connector holds its loop strongly, so weak keys would never be collected anyway.
+    _connectors = {}
+
+    def __init__(self, Tokens, max_concurrency=25):
         # drbt = # account information
         self.key = Tokens['Deribit']['Read']['id']
         self.secret = Tokens['Deribit']['Read']['secret']
         self.session = requests.Session()
+        self.session.headers.update({"Content-Type": 'application/json'})
+        self.session.mount('https://', HTTPAdapter(pool_maxsize=self.POOL_SIZE))
         self.url = 'https://www.deribit.com'
-        self.token = self.get_token()
-        self.update = datetime.now().timestamp()
+        self.ws_url = 'wss://www.deribit.com/ws/api/v2'
+        self._token_expiry = 0
+        self.token = None
+        self._auth_headers = None
+        self._ensure_token()
+        self.max_concurrency = max_concurrency
+        self._session = None
+        self._sem = None
+        self._loop = None
+        self._ws = None
+        self._ws_lock = None
+        self._token_lock = None
+        self._ws_reader = None
+        self._rpc_pending = {}
+        self._rpc_id = 0
+        self._symbols_cache = {}
 
     def request(self, action):
-        if datetime.now().timestamp() - self.update > 800:
-            self.token = self.get_token()
-        if action.startswith('/api/v2/private'):
-            response = self.session.get(self.url + action, headers={
-                "Content-Type": 'application/json',
-                "Authorization": "Bearer " + self.token
-            })
-            return response.json()
+        self._ensure_token()
+        private = action.startswith('/api/v2/private')
+        resend_safe = not self._places_order(action)
+        attempt, refreshed = 0, False
+        while True:
+            try:
+                response = self.session.get(self.url + action, headers=self._auth_headers if private else None,
+                                            timeout=self.REQUEST_TIMEOUT)
+            except (requests.ConnectionError, requests.Timeout) as e:
+                if attempt + 1 >= self.MAX_ATTEMPTS or not (resend_safe or self._not_sent(e)):
+                    raise
+            else:
+                if not self._transient(response.status_code, attempt, resend_safe):
+                    data = _loads(response.content)
+                    if private and not refreshed and self._token_expired(response.status_code, data):
+                        # The token lapsed mid-flight: renew and resend once, outside the backoff budget
+                        refreshed = True
+                        self._ensure_token(force=True)
+                        continue
+                    return data
+            sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _transient(self, status, attempt, resend_safe=True):
+        if attempt + 1 >= self.MAX_ATTEMPTS:
+            return False
+        # A 429 is rejected unprocessed; a 5xx may arrive after an order was already accepted
+        return status == 429 or (resend_safe and status >= 500)
 
-        else:
-            response = self.session.get(self.url + action)
-            return response.json()
+    @classmethod
+    def _places_order(cls, url):
+        return urlsplit(url).path in cls.ORDER_METHODS
+
+    @staticmethod
+    def _not_sent(error):
+        # Connect-phase failures: the request never left this host, so resending cannot duplicate it
+        reason = getattr(error.args[0], 'reason', None) if error.args else None
+        return isinstance(error, requests.ConnectTimeout) or isinstance(reason, NewConnectionError)
+
+    def _token_expired(self, status, data):
+        # Gateways can answer with a plain-string error, so only a JSON-RPC error object carries a code
+        error = data.get('error') if isinstance(data, dict) else None
+        return status == 401 or (isinstance(error, dict) and error.get('code') == self.TOKEN_EXPIRED_CODE)
+
+    @staticmethod
+    def _backoff(attempt):
+        return 2 ** attempt * random.uniform(0.5, 1.5)
+
+    async def _get_session(self):
+        # aiohttp sessions belong to the event loop that created them
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            if self._session is not None:
+                # The old loop's session can't be closed from here; give back its share of that loop's pool
+                self._drop_connector_use(self._loop)
+            self._loop = loop
+            self._session = None
+            self._ws = None
+            # Caps in-flight requests so large batches don't trip Deribit's rate limits
+            self._sem = asyncio.Semaphore(self.max_concurrency)
+            self._ws_lock = asyncio.Lock()
+            self._token_lock = asyncio.Lock()
+        if self._session is None or self._session.closed:
+            self._session = ClientSession(connector=self._acquire_connector(loop), connector_owner=False,
+                                          timeout=ClientTimeout(total=self.REQUEST_TIMEOUT))
+        return self._session
+
+    @classmethod
+    def _acquire_connector(cls, loop):
+        # Keep-alive pool: repeated calls reuse warm TCP+TLS connections instead of re-handshaking.
+        # aiohttp already sets TCP_NODELAY on its sockets, so small JSON requests are not held back by Nagle.
+        # Loops that ended without close() leave their entry behind; drop those before adding another
+        for stale in [stale for stale in cls._connectors if stale.is_closed()]:
+            del cls._connectors[stale]
+        entry = cls._connectors.get(loop)
+        if entry is None or entry[0].closed:
+            connector = TCPConnector(limit=cls.POOL_SIZE, ttl_dns_cache=300, keepalive_timeout=75,
+                                     enable_cleanup_closed=True)
+            entry = [connector, 0]
+            cls._connectors[loop] = entry
+        entry[1] += 1
+        return entry[0]
+
+    @classmethod
+    def _drop_connector_use(cls, loop):
+        # Returns the loop's connector once its last user is gone, so the caller can close it
+        entry = cls._connectors.get(loop)
+        if entry is None:
+            return None
+        entry[1] -= 1
+        if entry[1] > 0:
+            return None
+        del cls._connectors[loop]
+        return entry[0]
+
+    @classmethod
+    async def _release_connector(cls, loop):
+        connector = cls._drop_connector_use(loop)
+        if connector is not None:
+            await connector.close()
+
+    async def close(self):
+        if self._ws is not None and not self._ws.closed:
+            await self._ws.close()
+        if self._ws_reader is not None and not self._ws_reader.done():
+            self._ws_reader.cancel()
+        self._ws = None
+        self._ws_reader = None
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+            await self._release_connector(self._loop)
+        self._session = None
+
+    async def _get_ws(self):
+        # One authenticated JSON-RPC websocket per loop; every order in a batch is pipelined over it
+        session = await self._get_session()
+        async with self._ws_lock:
+            if self._ws is None or self._ws.closed:
+                self._ws = await session.ws_connect(self.ws_url, heartbeat=30)
+                self._rpc_pending = {}
+                self._ws_reader = asyncio.ensure_future(self._read_ws(self._ws, self._rpc_pending))
+                try:
+                    auth = await self._ws_call('public/auth', {'grant_type': 'client_credentials',
+                                                               'client_id': self.key,
+                                                               'client_secret': self.secret})
+                    if 'error' in auth:
+                        raise ConnectionError("Deribit websocket auth failed: {}".format(auth['error']))
+                except BaseException:
+                    # Never leave an unauthenticated socket behind for the next caller to send orders on
+                    ws, self._ws = self._ws, None
+                    await ws.close()
+                    raise
+        return self._ws
+
+    @staticmethod
+    async def _read_ws(ws, pending):
+        try:
+            async for msg in ws:
+                if msg.type == WSMsgType.TEXT:
+                    data = _loads(msg.data)
+                    future = pending.pop(data.get('id'), None)
+                    if future is not None and not future.done():
+                        future.set_result(data)
+        finally:
+            for future in pending.values():
+                if not future.done():
+                    future.set_exception(ConnectionError("Deribit websocket closed"))
+            pending.clear()
+
+    async def _ws_call(self, method, params):
+        self._rpc_id += 1
+        request_id = self._rpc_id
+        future = asyncio.get_running_loop().create_future()
+        self._rpc_pending[request_id] = future
+        try:
+            await self._ws.send_str(json.dumps({'jsonrpc': '2.0', 'id': request_id, 'method': method,
+                                                'params': params}))
+            # Same budget as a REST call, so an unanswered id cannot hang a whole batch
+            return await asyncio.wait_for(future, self.REQUEST_TIMEOUT)
+        finally:
+            self._rpc_pending.pop(request_id, None)
+
+    async def _rpc(self, method, params):
+        await self._get_ws()
+        async with self._sem:
+            return await self._ws_call(method, params)
+
+    async def arequest(self, action):
+        private = action.startswith('/api/v2/private')
+        if private:
+            await self._aensure_token()
+        return await self._aget(self.url + action, private)
 
     async def async_engine(self, url):
         # print('request: ' + str(time.time()))
-        async with ClientSession() as session:
-            async with session.get(url, headers={
-                "Content-Type": 'application/json',
-                "Authorization": "Bearer " + self.token}) as response:
-                response = await response.read()
-        return json.loads(response)
+        return await self._aget(url, True)
+
+    async def _aget(self, url, private):
+        # Async counterpart of request(): same retry, no-resend-for-orders and token-renewal rules
+        session = await self._get_session()
+        resend_safe = not self._places_order(url)
+        attempt, refreshed = 0, False
+        while True:
+            token = self.token
+            try:
+                async with self._sem, session.get(url, headers=self._auth_headers if private else None) as response:
+                    status, body = response.status, await response.read()
+            except (ClientError, asyncio.TimeoutError) as e:
+                if attempt + 1 >= self.MAX_ATTEMPTS or not (resend_safe or isinstance(e, ClientConnectorError)):
+                    raise
+            else:
+                if not self._transient(status, attempt, resend_safe):
+                    data = _loads(body)
+                    if private and not refreshed and self._token_expired(status, data):
+                        refreshed = True
+                        await self._aensure_token(rejected=token)
+                        continue
+                    return data
+            await asyncio.sleep(self._backoff(attempt))
+            attempt += 1
+
+    def _run(self, coro):
+        # Sync entry point: run on a fresh loop and release its connections before the loop closes
+        async def runner():
+            try:
+                return await coro
+            finally:
+                await self.close()
+
+        return asyncio.run(runner())
 
     def place_order(self, urls: list):
-        self.token = self.get_token()
-        # print(urls)
-        orders = []
-        for url in urls:
-            order = asyncio.ensure_future(self.async_engine(url))
-            orders.append(order)
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(asyncio.wait(orders))
-        return [order.result() for order in orders]
-
-    async def _place_order(self, urls: list, loop):
-        self.token = self.get_token()
+        return self._run(self.aplace_order(urls))
+
+    async def aplace_order(self, urls: list):
+        await self._aensure_token()
         # print(urls)
-        orders = []
-        for url in urls:
-            order = asyncio.ensure_future(self.async_engine(url))
-            orders.append(order)
-        await asyncio.wait(orders, return_when=asyncio.ALL_COMPLETED, loop=loop)
-        return [order.result() for order in orders]
+        return await asyncio.gather(*[self.async_engine(url) for url in urls])
 
     def get_positions(self, ccy='BTC', kind=None):
         """
@@ -73,21 +292,34 @@ class Deribit:
 
         return self.request("/api/v2/private/positions?currency={}".format(ccy))
 
+    async def aget_positions(self, ccy='BTC', kind=None):
+        if kind:
+            return await self.arequest("/api/v2/private/positions?currency={}&kind={}".format(ccy, kind))
+        return await self.arequest("/api/v2/private/positions?currency={}".format(ccy))
 
     def get_margin(self, ccy='BTC'):
         return self.request('/api/v2/private/get_account_summary?currency={}'.format(ccy))
 
+    async def aget_margin(self, ccy='BTC'):
+        return await self.arequest('/api/v2/private/get_account_summary?currency={}'.format(ccy))
+
     def get_order_info(self, order_id):
         return self.request('/api/v2/private/get_order_state?order_id={}'.format(order_id))
 
+    async def aget_order_info(self, order_id):
+        return await self.arequest('/api/v2/private/get_order_state?order_id={}'.format(order_id))
+
     def get_open_orders(self, ccy='BTC'):
         """
 
         :param ccy: BTC or ETH
         :return:
         """
-        self.ccy = ccy
-        result = self.request('/api/v2/private/get_open_orders_by_currency?currency={}'.format(self.ccy))
+        result = self.request('/api/v2/private/get_open_orders_by_currency?currency={}'.format(ccy))
+        return [res['order_id'] for res in result['result']]
+
+    async def aget_open_orders(self, ccy='BTC'):
+        result = await self.arequest('/api/v2/private/get_open_orders_by_currency?currency={}'.format(ccy))
         return [res['order_id'] for res in result['result']]
 
     def tradeable_symbols(self, ccy='BTC', kind=None):
@@ -97,17 +329,24 @@ class Deribit:
         :param type: 'future' or 'option'
         :return:
         """
+        cached = self._symbols_cache.get((ccy, kind))
+        if cached is not None and time() - cached[0] < self.SYMBOLS_TTL:
+            return list(cached[1])
         if kind:
             data = self.request('/api/v2/public/get_instruments?currency={}&kind={}'.format(ccy, kind))
-            return sorted([x['instrument_name'] for x in data['result']])
         else:
             data = self.request('/api/v2/public/get_instruments?currency={}'.format(ccy))
-            return sorted([x['instrument_name'] for x in data['result']])
+        symbols = sorted([x['instrument_name'] for x in data['result']])
+        self._symbols_cache[(ccy, kind)] = (time(), symbols)
+        return list(symbols)
 
 
     def get_index_price(self, index_name):
         return self.request('/api/v2/public/get_index_price?index_name={}'.format(index_name))
 
+    async def aget_index_price(self, index_name):
+        return await self.arequest('/api/v2/public/get_index_price?index_name={}'.format(index_name))
+
     def get_order_book(self, instrument_name='BTC-PERPETUAL', depth=5):
         """
 
@@ -119,164 +358,111 @@ class Deribit:
             'result']
         return {'instrument_name': instrument_name, 'bid': book['bids'], 'ask': book['asks'], 'timestamp': book['timestamp']}
 
+    async def aget_order_book(self, instrument_name='BTC-PERPETUAL', depth=5):
+        book = (await self.arequest(
+            '/api/v2/public/get_order_book?depth={}&instrument_name={}'.format(depth, instrument_name)))['result']
+        return {'instrument_name': instrument_name, 'bid': book['bids'], 'ask': book['asks'], 'timestamp': book['timestamp']}
+
     def get_token(self):
         response = self.session.get(
-            self.url + "/api/v2/public/auth?client_id={}&client_secret={}&grant_type=client_credentials".format(
-                self.key, self.secret),
-            headers={'Content-Type': 'application/json'})
+            self.url + "/api/v2/public/auth?" + urlencode(
+                {'client_id': self.key, 'client_secret': self.secret, 'grant_type': 'client_credentials'}),
+            timeout=self.REQUEST_TIMEOUT)
         # print(response.json())
-        return response.json()['result']['access_token']
+        result = _loads(response.content)['result']
+        self._token_expiry = time() + result['expires_in'] - self.TOKEN_REFRESH_BUFFER
+        return result['access_token']
+
+    def _ensure_token(self, force=False):
+        # Renew proactively shortly before expiry instead of on every batch
+        if force or time() >= self._token_expiry:
+            self.token = self.get_token()
+            # Built once per token; aiohttp and requests copy the dict, so it is safe to share
+            self._auth_headers = {"Content-Type": 'application/json', "Authorization": "Bearer " + self.token}
+
+    async def _aensure_token(self, rejected=None):
+        # get_token is a blocking requests call, so renewals run in a worker thread instead of on the loop.
+        # rejected: the token a request just failed with; under the lock, only the first task of a batch renews it
+        if rejected is None and time() < self._token_expiry:
+            return
+        await self._get_session()
+        async with self._token_lock:
+            if rejected is None:
+                await asyncio.to_thread(self._ensure_token)
+            elif self.token == rejected:
+                await asyncio.to_thread(self._ensure_token, True)
+
+    @classmethod
+    def _private_action(cls, method, params):
+        return '/api/v2/private/' + method + '?' + urlencode(params)
+
+    def _private_url(self, method, params):
+        return self.url + self._private_action(method, params)
+
+    @classmethod
+    def _order_summary(cls, side, res):
+        if 'result' not in res:
+            return res
+        order = res['result']['order']
+        return f"Deribit {side} {order['amount']} {order['instrument_name']}@{order['price']} ID:{order['order_id']}"
+
+    @classmethod
+    def _cancel_summary(cls, res):
+        result = res['result']
+        return f"Deribit Order {result['order_id']} cancelled" if result['order_state'] == 'cancelled' else result
 
     def buy_limit(self, symbol, price, quantity, label=""):
-        result = self.place_order(
-            urls=[self.url + '/api/v2/private/buy?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                str(quantity), symbol, str(price), label)]
-        )
-        return ["Deribit Buy {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                    res['result']['order']['instrument_name'],
-                                                    res['result']['order']['price'],
-                                                    res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'buy', {'amount': quantity, 'instrument_name': symbol, 'price': price, 'label': label, 'type': 'limit'}))
+        return [self._order_summary('Buy', result)]
 
     def sell_limit(self, symbol, price, quantity, label=""):
-        result = self.place_order(
-            urls=[
-                self.url + '/api/v2/private/sell?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                    str(quantity), symbol, str(price), label)]
-        )
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'sell', {'amount': quantity, 'instrument_name': symbol, 'price': price, 'label': label, 'type': 'limit'}))
+        return [self._order_summary('Sell', result)]
 
     def sell_market(self, symbol, quantity, label=""):
-        result = self.place_order(
-            urls=[
-                self.url + '/api/v2/private/sell?amount={}&instrument_name={}&label={}&type=market'.format(
-                    str(quantity), symbol, label)]
-        )
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'sell', {'amount': quantity, 'instrument_name': symbol, 'label': label, 'type': 'market'}))
+        return [self._order_summary('Sell', result)]
 
     def buy_market(self, symbol, quantity, label=""):
-        result = self.place_order(
-            urls=[
-                self.url + '/api/v2/private/buy?amount={}&instrument_name={}&label={}&type=market'.format(
-                    str(quantity), symbol, label)]
-        )
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'buy', {'amount': quantity, 'instrument_name': symbol, 'label': label, 'type': 'market'}))
+        return [self._order_summary('Buy', result)]
 
     def buy_market_stop(self, symbol, quantity, stop_price, label=""):
-        result = self.place_order(
-            urls=[
-                self.url + '/api/v2/private/buy?amount={}&instrument_name={}&label={}&type=stop_market&stop_price = {}'.format(
-                    str(quantity), symbol, label, stop_price)]
-        )
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'buy', {'amount': quantity, 'instrument_name': symbol, 'label': label, 'type': 'stop_market',
+                   'stop_price': stop_price}))
+        return [self._order_summary('Buy', result)]
 
     def sell_market_stop(self, symbol, quantity, stop_price, label=""):
-        result = self.place_order(
-            urls=[
-                self.url + '/api/v2/private/sell?amount={}&instrument_name={}&label={}&type=stop_market&stop_price = {}'.format(
-                    str(quantity), symbol, label, stop_price)]
-        )
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        result = self.request(self._private_action(
+            'sell', {'amount': quantity, 'instrument_name': symbol, 'label': label, 'type': 'stop_market',
+                    'stop_price': stop_price}))
+        return [self._order_summary('Sell', result)]
 
     def buy_limit_batch(self, orders_info: list):
-
-        urls = []
-        # print(type(orders_info))
-        for order in orders_info:
-            urls.append(
-                self.url + '/api/v2/private/buy?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                    order['quantity'], order['symbol'], order['price'], order['label']
-                ))
-        result = self.place_order(urls=urls)
-        # print(result)
-        return ["Deribit Buy {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                    res['result']['order']['instrument_name'],
-                                                    res['result']['order']['price'],
-                                                    res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
+        return self._run(self._buy_limit_batch(orders_info))
 
     def sell_limit_batch(self, orders_info: list):
+        return self._run(self._sell_limit_batch(orders_info))
 
-        urls = []
-        for order in orders_info:
-            urls.append(
-                self.url + '/api/v2/private/sell?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                    order['quantity'], order['symbol'], order['price'], order['label']
-                ))
-        result = self.place_order(urls=urls)
-        print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'],
-                                                     res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
-
-    async def _buy_limit_batch(self, orders_info: list, loop):
+    @classmethod
+    def _limit_order_params(cls, order):
+        return {'instrument_name': order['symbol'], 'amount': order['quantity'], 'price': order['price'],
+                'label': order['label'], 'type': 'limit'}
 
-        urls = []
-        # print(type(orders_info))
-        for order in orders_info:
-            urls.append(
-                self.url + '/api/v2/private/buy?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                    order['quantity'], order['symbol'], order['price'], order['label']
-                ))
-        result = await self._place_order(urls=urls, loop=loop)
-        # (result)
-        return ["Deribit Buy {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                    res['result']['order']['instrument_name'],
-                                                    res['result']['order']['price'],
-                                                    res['result']['order']['order_id']) if 'result' in res else res
-                for
-                res in result]
-
-    async def _sell_limit_batch(self, orders_info: list, loop):
-        urls = []
-        for order in orders_info:
-            urls.append(
-                self.url + '/api/v2/private/sell?amount={}&instrument_name={}&price={}&label={}&type=limit'.format(
-                    order['quantity'], order['symbol'], order['price'], order['label']
-                ))
-        result = await self._place_order(urls=urls, loop=loop)
-        # print(result)
-        return ["Deribit Sell {} {}@{} ID:{}".format(res['result']['order']['amount'],
-                                                     res['result']['order']['instrument_name'],
-                                                     res['result']['order']['price'], res['result']['order'][
-                                                         'order_id']) if 'result' in res == 'open' else res for res
-                in
-                result]
+    async def _buy_limit_batch(self, orders_info: list):
+        result = await asyncio.gather(
+            *[self._rpc('private/buy', self._limit_order_params(order)) for order in orders_info])
+        return [self._order_summary('Buy', res) for res in result]
+
+    async def _sell_limit_batch(self, orders_info: list):
+        result = await asyncio.gather(
+            *[self._rpc('private/sell', self._limit_order_params(order)) for order in orders_info])
+        return [self._order_summary('Sell', res) for res in result]
 
     def cancel_all_order(self):
         return self.request('/api/v2/private/cancel_all?')
@@ -285,74 +471,47 @@ class Deribit:
         return self.request('/api/v2/private/edit?&amount={}&order_id={}&price={}'.format(amount, orderID, price))
 
     def _cancel(self, urls: list):
-        self.token = self.get_token()
-        orders = []
-        for url in urls:
-            order = asyncio.ensure_future(self.async_engine(url))
-            orders.append(order)
-        loop = asyncio.get_event_loop()
-        loop.run_until_complete(asyncio.wait(orders))
-        return [order.result() for order in orders]
-
-    async def _cancelAync(self, urls: list, loop):
-        self.token = self.get_token()
-        # print(urls)
-        orders = []
-        for url in urls:
-            order = asyncio.ensure_future(self.async_engine(url))
-            orders.append(order)
-        await asyncio.wait(orders, return_when=asyncio.ALL_COMPLETED, loop=loop)
-        return [order.result() for order in orders]
-
-    async def _cancel_batch_order(self, orders: list, loop):
+        return self._run(self._cancelAync(urls))
+
+    async def _cancelAync(self, urls: list):
+        return await self.aplace_order(urls)
+
+    async def _cancel_batch_order(self, orders: list):
         # print(orders)
         urls = []
         for order_id in orders:
-            urls.append(self.url + "/api/v2/private/cancel?order_id={}".format(order_id))
-        result = await self._cancelAync(urls, loop=loop)
-        return ["Deribit Order {} cancelled".format(res['result']['order_id']) if res['result'][
-                                                                                      'order_state'] == 'cancelled' else
-                res['result'] for res in result]
+            urls.append(self._private_url('cancel', {'order_id': order_id}))
+        result = await self._cancelAync(urls)
+        return [self._cancel_summary(res) for res in result]
 
     def cancel_order(self, order_id):
-        result = self._cancel([self.url + "/api/v2/private/cancel?order_id={}".format(order_id)])
-        return ["Deribit Order {} cancelled".format(res['result']['order_id']) if res['result'][
-                                                                                      'order_state'] == 'cancelled' else
-                res['result'] for res in result]
+        result = self.request(self._private_action('cancel', {'order_id': order_id}))
+        return [self._cancel_summary(result)]
 
     def cancel_batch_order(self, orders: list):
         urls = []
         for order_id in orders:
-            urls.append(self.url + "/api/v2/private/cancel?order_id={}".format(order_id))
+            urls.append(self._private_url('cancel', {'order_id': order_id}))
         result = self._cancel(urls)
-        return ["Deribit Order {} cancelled".format(res['result']['order_id']) if res['result'][
-                                                                                      'order_state'] == 'cancelled' else
-                res['result'] for res in result]
+        return [self._cancel_summary(res) for res in result]
 
     def get_orders(self, count):
         return self.request('/api/v2/private/get_order_history_by_currency?count={}&currency=BTC'.format(count))
 
+    async def aget_orders(self, count):
+        return await self.arequest(
+            '/api/v2/private/get_order_history_by_currency?count={}&currency=BTC'.format(count))
+
     @classmethod
     def conv_drbt_dates(cls, dates):
-        mon_cal = {
-            "JAN":1,
-            "FEB":2,
-            "MAR":3,
-            "APR":4,
-            "MAY":5,
-            "JUN":6,
-            "JUL":7,
-            "AUG":8,
-            "SEP":9,
-            "OCT":10,
-            "NOV":11,
-            "DEC":12
-        }
-        dd = int(dates[:2])
-        mm = mon_cal[dates[2:4]]
-        yy = int(dates[4:])
-
-        return datetime(2000+yy,mm,dd)
+        """
+
+        :param dates: Deribit expiry code such as '25JUN21', or an iterable of them
+        :return: datetime for a single code, pandas Series of Timestamps for an iterable
+        """
+        if isinstance(dates, str):
+            return datetime.strptime(dates, '%d%b%y')
+        return pd.to_datetime(pd.Series(list(dates)), format='%d%b%y')
 
 
 
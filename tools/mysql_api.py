@@ -1,4 +1,6 @@
 import json
+import os
+import tempfile
 import pymysql
 import pandas as pd
 from sqlalchemy import create_engine, Table, Column, Integer, String, MetaData, ForeignKey
@@ -23,30 +25,84 @@ class Config:
 
 
 class SQLEngine:
+    # Server/client refusals of LOAD DATA LOCAL (not allowed, local_infile disabled, rejected by the client)
+    LOCAL_INFILE_REJECTED = (1148, 3948, 2068)
 
     def __init__(self):
         self.db_engine = create_engine(
             'mysql+pymysql://{}:{}@{}/{}'.format(Config.USER, Config.PASSWORD, Config.HOST, Config.DATABASE))
+        self._infile_engine = None
+        # Reflected tables are cached here, so only the first get_table per table hits the server
+        self._metadata = MetaData()
 
     def connection(self):
         return self.db_engine.connect()
 
+    def local_infile_engine(self):
+        # LOCAL INFILE lets the server request any client file on that connection, so only LOAD DATA gets it
+        if self._infile_engine is None:
+            self._infile_engine = create_engine(self.db_engine.url, connect_args={'local_infile': 1})
+        return self._infile_engine
+
     def get_table(self, table_name):
-        metadata = MetaData(bind=self.db_engine, reflect=True)
-        return metadata.tables[table_name]
+        return Table(table_name, self._metadata, autoload_with=self.db_engine)
 
     def create_table(self, table_name=None, columns_info=None):
-        metadata = MetaData()
-        [Column(key, item, primary_key=False) if key != columns_info['primary_key'] else Column(key, item,
-                                                                                                primary_key=True) for
-         key, item in columns_info['columns'].items()]
-        table = Table(*[table_name, metadata] + [Column(key, item) for key, item in columns_info['columns'].items()])
-        metadata.create_all(self.db_engine)
+        if table_name in self._metadata.tables:
+            # Drop the cached definition; the new table replaces it
+            self._metadata.remove(self._metadata.tables[table_name])
+        columns = [Column(key, item, primary_key=(key == columns_info['primary_key']))
+                   for key, item in columns_info['columns'].items()]
+        table = Table(table_name, self._metadata, *columns)
+        table.create(self.db_engine, checkfirst=True)
         return table
 
     def insert(self, data=None, table=None):
-        self.connection().execute(table.insert(), data)
-        self.connection().close()
+        with self.db_engine.begin() as con:
+            con.execute(table.insert(), data)
+
+    def insert_rows(self, table=None, rows=None, ignore_duplicates=False):
+        # rows are tuples in table column order; pymysql's executemany folds them into multi-row INSERTs
+        sql = 'INSERT INTO {} ({}) VALUES ({})'.format(table.name,
+                                                       ', '.join(column.name for column in table.columns),
+                                                       ', '.join(['%s'] * len(table.columns)))
+        key = next(iter(table.primary_key.columns), None)
+        if ignore_duplicates and key is not None:
+            # A no-op update skips rows whose key already exists; unlike INSERT IGNORE it keeps
+            # conversion, truncation and NOT NULL errors as errors
+            sql += ' ON DUPLICATE KEY UPDATE {0}={0}'.format(key.name)
+        con = self.db_engine.raw_connection()
+        try:
+            cursor = con.cursor()
+            cursor.executemany(sql, rows)
+            cursor.close()
+            con.commit()
+        finally:
+            con.close()
+
+    def bulk_insert_df(self, df=None, table_name=None):
+        # LOAD DATA parses one CSV stream server-side; falls back to multi-row INSERTs if local_infile is disabled
+        with tempfile.NamedTemporaryFile('w', suffix='.csv', delete=False, newline='') as f:
+            df.to_csv(f, index=False, header=False, na_rep='\\N', lineterminator='\n')
+            path = f.name
+        sql = ("LOAD DATA LOCAL INFILE %s INTO TABLE `{}` FIELDS TERMINATED BY ',' OPTIONALLY ENCLOSED BY '\"' "
+               "LINES TERMINATED BY '\\n' ({})").format(table_name, ', '.join('`{}`'.format(c) for c in df.columns))
+        try:
+            con = self.local_infile_engine().raw_connection()
+            try:
+                cursor = con.cursor()
+                cursor.execute(sql, (path,))
+                cursor.close()
+                con.commit()
+            finally:
+                con.close()
+        except pymysql.err.MySQLError as e:
+            # Anything else (duplicate keys, bad rows, lock timeouts) is a real failure, not a reason to load twice
+            if e.args[0] not in self.LOCAL_INFILE_REJECTED:
+                raise
+            df.to_sql(table_name, self.db_engine, if_exists='append', index=False, method='multi', chunksize=1000)
+        finally:
+            os.remove(path)
 
     def execute(self, sql=None):
         with self.connection() as con: